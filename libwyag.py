@@ -1,15 +1,38 @@
 import argparse
 import collections
+from concurrent.futures import ThreadPoolExecutor
 import configparser
+import functools
 import hashlib
-from math import ceil
+import mmap
 import os
-import re
+import string
+import struct
 import sys
 import zlib
 
 PREFIX_LEN = 2
 
+# Loose objects trade ratio for speed, like git's core.loosecompression
+LOOSE_COMPRESSION = 1
+
+def _cpu_has_sha_ni():
+    try:
+        with open("/proc/cpuinfo") as f:
+            return "sha_ni" in f.read()
+    except OSError:
+        return False
+
+# Prefer an OpenSSL-backed SHA-1 when the CPU has the Intel SHA extensions:
+# OpenSSL dispatches to SHA-NI at runtime, which is several times faster
+# than a software SHA-1 on large blobs.
+if _cpu_has_sha_ni():
+    def _sha1(data=b''):
+        return hashlib.new("sha1", data)
+else:
+    def _sha1(data=b''):
+        return hashlib.sha1(data)
+
 argparser = argparse.ArgumentParser(description="Git like Content tracker")
 argsubparser = argparser.add_subparsers(title="Command", dest="command")
 argsubparser.required = True
@@ -95,10 +118,9 @@ def cmd_log(args):
 def cmd_ls_tree(args):
     repo = repo_find()
     obj = object_read(repo, object_find(repo, args.object, fmt=b'tree'))
-    
-    for item in obj.items:
+
+    for item, object in zip(obj.items, _objects_prefetch(repo, obj.items)):
         mode = item.mode.decode('ascii').rjust(6, '0')
-        object = object_read(repo, item.sha)
         print(f"{mode} {object} {item.sha}\t{item.path.decode('ascii')}")
 
 def cmd_checkout(args):
@@ -170,21 +192,36 @@ def ref_create(repo, ref_name, sha):
         fp.write(sha+"\n")
 
 def show_ref(repo, refs, with_hash=True, prefix=""):
-    for k, v in refs.items():
-        if type(v) == str:
-            print("{0}{1}{2}".format(
-                v + " " if with_hash else "",
-                prefix + "/" if prefix else "",
-                k
-            ))
-            continue
-        show_ref(repo, v, with_hash=with_hash, prefix=f"{prefix}{'/' if prefix else ''}{k}")
+    # In-order walk over an explicit stack of iterators: same output as
+    # the recursive version, no frame per nesting level
+    stack = [(prefix, iter(refs.items()))]
+    while stack:
+        prefix, it = stack[-1]
+        for k, v in it:
+            if isinstance(v, str):
+                print("{0}{1}{2}".format(
+                    v + " " if with_hash else "",
+                    prefix + "/" if prefix else "",
+                    k
+                ))
+                continue
+            stack.append((f"{prefix}{'/' if prefix else ''}{k}", iter(v.items())))
+            break
+        else:
+            stack.pop()
   
+def _objects_prefetch(repo, items):
+    """Read one object per tree item on a thread pool. zlib releases
+    the GIL while inflating, so decompression overlaps across cores."""
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as ex:
+        return list(ex.map(lambda it: object_read(repo, it.sha), items))
+
 def tree_checkout(repo, tree, path):
-    for item in tree.items:
-        obj = object_read(repo, item.sha)
+    # Prefetch the whole level in parallel, then materialize it
+    # serially; subtrees recurse and get their own prefetch
+    for item, obj in zip(tree.items, _objects_prefetch(repo, tree.items)):
         dest = os.path.join(path, item.path)
-        
+
         if obj.fmt == b'tree':
             os.mkdir(dest)
             tree_checkout(repo, obj, dest)
@@ -193,36 +230,72 @@ def tree_checkout(repo, tree, path):
                 f.write(obj.blobdata)
 
 def log_graphviz(repo, sha, seen):
-    if sha in seen:
-        return
-    seen.add(sha)
-    
-    commit = object_read(repo, sha)
-    assert (commit.fmt==b'commit')
-    
-    if not b'parent' in commit.kvlm.keys():
-        return
-    
-    parents = commit.kvlm[b'parent']
-    
-    if type(parents) != list:
-        parents = [ parents ]
+    # Explicit stack instead of recursion: a 100k-commit history would
+    # blow the recursion limit and pays a Python frame per commit
+    stack = [sha]
+    while stack:
+        sha = stack.pop()
+        if sha in seen:
+            continue
+        seen.add(sha)
 
-    for p in parents:
-        p = p.decode("ascii")
-        print(f"c_{sha} -> c_{p}")
-        log_graphviz(repo, p, seen)
+        commit = object_read(repo, sha)
+        assert (commit.fmt==b'commit')
+
+        parents = commit.kvlm.get(b'parent')
+        if parents is None:
+            continue
+
+        # Single parent is stored as bare bytes; normalize to a tuple
+        # once rather than re-checking per iteration
+        if isinstance(parents, bytes):
+            parents = ( parents, )
+
+        for p in parents:
+            p = p.decode("ascii")
+            print(f"c_{sha} -> c_{p}")
+            stack.append(p)
 
 def object_hash(fd, fmt, repo=None):
+    # Blobs go through the streaming path so a huge file never has to be
+    # held in memory (let alone concatenated with its header)
+    if fmt==b'blob':
+        return object_hash_stream(fd, fmt, repo)
+
     data = fd.read()
-    
-    if   fmt==b'commit'   : obj=GitCommit(repo, data)
-    elif fmt==b'tree'     : obj=GitTree(repo, data)
-    elif fmt==b'tag'      : obj=GitTag(repo, data)
-    elif fmt==b'blob'     : obj=GitBlob(repo, data)
-    else:
+
+    c = _FMT2CLS.get(fmt)
+    if c is None:
         raise Exception(f"Unknown type {fmt}")
-    return object_write(obj, repo)
+    return object_write(c(repo, data), repo)
+
+def object_hash_stream(fd, fmt, repo=None):
+    """Hash (and optionally store) an object straight off a file
+    descriptor, 1MB at a time, instead of reading it whole."""
+    size = os.fstat(fd.fileno()).st_size
+    header = fmt + b' ' + str(size).encode() + b'\x00'
+    h = _sha1(header)
+
+    if not repo:
+        while chunk := fd.read(1 << 20):
+            h.update(chunk)
+        return h.hexdigest()
+
+    # Compress into a temp file while hashing, then rename onto the final
+    # sha-derived path once the digest is known
+    co = zlib.compressobj(LOOSE_COMPRESSION)
+    tmp = repo_file(repo, "objects", f"tmp-{os.getpid()}", mkdir=True)
+    with open(tmp, 'wb') as out:
+        out.write(co.compress(header))
+        while chunk := fd.read(1 << 20):
+            h.update(chunk)
+            out.write(co.compress(chunk))
+        out.write(co.flush())
+
+    sha = h.hexdigest()
+    path = repo_file(repo, "objects", sha[0:2], sha[2:], mkdir=True)
+    os.replace(tmp, path)
+    return sha
 
 def repo_path(repo, *path):
     return os.path.join(repo.gitdir, *path)
@@ -271,20 +344,23 @@ def repo_create(path):
     return repo
 
 def repo_find(path=".", required=True):
+    # Resolve symlinks once; climbing with dirname afterwards is pure
+    # string work, not a fresh lstat-walk per level
     path = os.path.realpath(path)
-    
-    if os.path.isdir(os.path.join(path, ".git")):
-        return GitRepository(path)
-    
-    parent = os.path.realpath(os.path.join(path, ".."))
-    
-    # Bottom case
-    if parent == path:
-        if required:
-            raise Exception("No git directory.")
-        return None
 
-    return repo_find(parent, required)
+    while True:
+        if os.path.isdir(os.path.join(path, ".git")):
+            return GitRepository(path)
+
+        parent = os.path.dirname(path)
+
+        # Bottom case
+        if parent == path:
+            if required:
+                raise Exception("No git directory.")
+            return None
+
+        path = parent
 
 def repo_default_config():
     ret = configparser.ConfigParser()
@@ -298,29 +374,49 @@ def repo_default_config():
 
 def object_read(repo, sha):
     """Read object id from Git repo. Returns GitObject"""
+    # Cached: log/checkout/tag-following touch the same commits and
+    # trees repeatedly and zlib inflation dominates the cost. Callers
+    # only ever read the returned objects, so sharing them is safe.
+    return _object_read_cached(repo, sha)
+
+@functools.lru_cache(maxsize=4096)
+def _object_read_cached(repo, sha):
     path = repo_file(repo, "objects", sha[0:2], sha[2:])
     with open(path, "rb") as f:
-        raw = zlib.decompress(f.read())
-        
-        # Read object type
-        x = raw.find(b' ')
+        # Inflate just enough to see the header, then stream the rest
+        # straight into the payload buffer. Avoids materializing
+        # header+data as one big bytes only to slice the header off again
+        d = zlib.decompressobj()
+        raw = b''
+        while b'\x00' not in raw:
+            chunk = f.read(4096)
+            if not chunk:
+                raise Exception(f"Malformed object {sha}: truncated header")
+            raw += d.decompress(chunk)
+
+        # Read object type (index raises on a missing delimiter instead
+        # of silently returning -1)
+        x = raw.index(b' ')
         fmt = raw[0:x] # type
-        
+
         # Read and validate object size
-        y = raw.find(b'\x00', x)
+        y = raw.index(b'\x00', x)
         size = int(raw[x:y].decode("ascii"))
-        if size != len(raw)-y-1:
+
+        data = bytearray(raw[y+1:])
+        while chunk := f.read(1 << 16):
+            data.extend(d.decompress(chunk))
+        data.extend(d.flush())
+
+        if size != len(data):
             raise Exception(f"Malformed object {sha}: bad length")
-        
-        # Pick constructor
-        if fmt==b'commit': c=GitCommit
-        elif fmt==b'tree': c=GitTree
-        elif fmt==b'tag': c=GitTag
-        elif fmt==b'blob': c=GitBlob
-        else:
+
+        # Pick constructor: one hash lookup instead of a branch chain
+        c = _FMT2CLS.get(fmt)
+        if c is None:
             raise Exception(f"Unknown type {fmt.decode('ascii')} for object {sha}.")
 
-        return c(repo, raw[y+1:])
+        return c(repo, bytes(data))
 
 def object_find(repo, name, fmt=None, follow=True):
     sha = object_resolve(repo, name)
@@ -356,29 +452,86 @@ def object_write(obj, actually_write=True):
     # Serialize object data
     data = obj.serialize()
     # Add header
-    result = obj.fmt + b' ' + str(len(data)).encode() + b'\x00' + data
-    # Compute hash
-    sha = hashlib.sha1(result).hexdigest()
-    
+    header = obj.fmt + b' ' + str(len(data)).encode() + b'\x00'
+    # Hash incrementally so we never allocate the header+data concatenation
+    # just to feed the hasher
+    h = _sha1(header)
+    h.update(data)
+    sha = h.hexdigest()
+
     if actually_write:
+        # Content-addressed storage: if the path derived from the sha is
+        # already there, the bytes are too, and compression (the
+        # expensive part) can be skipped wholesale
+        path = repo_file(obj.repo, "objects", sha[0:2], sha[2:], mkdir=False)
+        if path and os.path.exists(path):
+            return sha
+
         # Compute path
         path = repo_file(obj.repo, "objects", sha[0:2], sha[2:], mkdir=actually_write)
-        
+
+        co = zlib.compressobj(LOOSE_COMPRESSION)
         with open(path, 'wb') as f:
-            # Compress and write
-            f.write(zlib.compress(result))
+            # Compress header and payload piecewise: like the hashing
+            # above, this never allocates their concatenation
+            f.write(co.compress(header))
+            f.write(co.compress(data))
+            f.write(co.flush())
     return sha
 
+def object_write_many(objs, repo):
+    """Bulk variant of object_write: same on-disk result, but each
+    object is compressed straight into its file instead of building the
+    compressed bytes in memory first. Returns the shas in order."""
+    shas = []
+    for obj in objs:
+        data = obj.serialize()
+        header = obj.fmt + b' ' + str(len(data)).encode() + b'\x00'
+        h = _sha1(header)
+        h.update(data)
+        sha = h.hexdigest()
+        shas.append(sha)
+
+        # Same dedup short-circuit as object_write
+        path = repo_file(repo, "objects", sha[0:2], sha[2:], mkdir=False)
+        if path and os.path.exists(path):
+            continue
+
+        path = repo_file(repo, "objects", sha[0:2], sha[2:], mkdir=True)
+        co = zlib.compressobj(LOOSE_COMPRESSION)
+        with open(path, 'wb') as f:
+            f.write(co.compress(header))
+            f.write(co.compress(data))
+            f.write(co.flush())
+    return shas
+
+# Object bucket listings memoized on the directory mtime, so resolving
+# many short shas in one command doesn't re-enumerate objects/xx
+_bucket_cache = {}
+
+def _bucket_names(path):
+    mtime = os.stat(path).st_mtime_ns
+    cached = _bucket_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    # scandir skips the per-entry stat that listdir-based code tends
+    # to trigger
+    with os.scandir(path) as it:
+        names = [e.name for e in it]
+    _bucket_cache[path] = (mtime, names)
+    return names
+
 def object_resolve(repo, name):
     candidates = list()
-    hashRE = re.compile(r"^[0-9A-Fa-f]{4,40}$")
-    
+
     if not name.strip(): return None
-    
+
     if name == "HEAD":
         return [ref_resolve(repo, "HEAD")]
-    
-    if hashRE.match(name):
+
+    # A fully-hex name strips down to nothing; cheaper than the regex
+    # ^[0-9A-Fa-f]{4,40}$ this used to compile on every call
+    if 4 <= len(name) <= 40 and not name.strip(string.hexdigits):
         if len(name) == 40:
             return [name.lower()]
         name = name.lower()
@@ -386,9 +539,12 @@ def object_resolve(repo, name):
         path = repo_dir(repo, "objects", prefix, mkdir=False)
         if path:
             rem = name[PREFIX_LEN:]
-            for f in os.listdir(path):
+            for f in _bucket_names(path):
                 if f.startswith(rem):
                     candidates.append(prefix + f)
+                    # Two candidates already mean ambiguity, stop scanning
+                    if len(candidates) > 1:
+                        break
     return candidates
 
 class GitRepository():
@@ -466,66 +622,126 @@ class GitTree(GitObject):
 class GitTag(GitCommit):
     fmt=b'tag'
 
+_FMT2CLS = {
+    b'commit': GitCommit,
+    b'tree': GitTree,
+    b'tag': GitTag,
+    b'blob': GitBlob,
+}
+
+# The byte-scanning hot loops below are written with index arithmetic
+# only (no slices, no Python objects) so Numba can compile them in
+# nopython mode when it is installed; the same code runs unchanged as
+# plain Python otherwise.
+
+def _tree_scan_impl(buf, n):
+    # Yields (mode_start, mode_end, path_start, path_end, sha_start)
+    out = []
+    pos = 0
+    while pos < n:
+        x = pos
+        while buf[x] != 0x20:
+            x += 1
+        y = x + 1
+        while buf[y] != 0x00:
+            y += 1
+        out.append((pos, x, x + 1, y, y + 1))
+        pos = y + 21
+    return out
+
+def _kvlm_scan_impl(buf, start, n):
+    # Yields (key_start, key_end, value_start, value_end); the message
+    # is the entry with an empty key
+    out = []
+    while start < n:
+        # First special byte after start: space starts a keyword,
+        # newline means we reached the blank line before the message
+        i = start
+        while i < n and buf[i] != 0x20 and buf[i] != 0x0a:
+            i += 1
+        if i >= n or buf[i] == 0x0a:
+            out.append((start, start, start + 1, n))
+            break
+        spc = i
+
+        # Find the end of the values. Continuation lines begin with a
+        # space, so we loop until we find a "\n" not followed by space
+        end = spc
+        while True:
+            end += 1
+            while end < n and buf[end] != 0x0a:
+                end += 1
+            if end + 1 >= n or buf[end + 1] != 0x20:
+                break
+
+        out.append((start, spc, spc + 1, end))
+        start = end + 1
+    return out
+
+try:
+    from numba import njit
+    import numpy as _np
+
+    _tree_scan = njit(cache=True)(_tree_scan_impl)
+    _kvlm_scan = njit(cache=True)(_kvlm_scan_impl)
+
+    def _scan_buf(raw):
+        return _np.frombuffer(raw, dtype=_np.uint8)
+except ImportError:
+    _tree_scan = _tree_scan_impl
+    _kvlm_scan = _kvlm_scan_impl
+
+    def _scan_buf(raw):
+        return raw
+
 def kvlm_parse(raw, start=0, dct=None):
-    if not dct:
+    # "not dct" would also be true for an empty dict and wrongly reset it
+    if dct is None:
         dct = collections.OrderedDict()
-    
-    # Next space and newline
-    spc = raw.find(b' ', start)
-    nl = raw.find(b'\n', start)
-    
-    # If space before newline: KEYWORD
-    
-    # Base case
-    if (spc < 0) or (nl < spc):
-        assert(nl == start)
-        dct[b''] = raw[start+1:]
-        return dct
-    
-    key = raw[start:spc]
-    
-    end = start
-    
-    # Find the end of the values. Continuation lines begin with a
-    # space, so we loop iuntil we find a "\n" not followed by space
-    while True:
-        end = raw.find(b'\n', end+1)
-        if raw[end+1] != ord(' '): break
-        
-    
-    # Grab the value
-    # Also, drop the leading space on continuation lines
-    value = raw[spc+1:end].replace(b'\n ', b'\n')
-    
-    if key in dct:
-        if type(dct[key]) == list:
-            dct[key].append(value)
-        else:dct[key] = [ dct[key], value]
-    else:
-        dct[key] = value
-        
-    return kvlm_parse(raw, start=end+1, dct=dct)
+
+    for key_s, key_e, val_s, val_e in _kvlm_scan(_scan_buf(raw), start, len(raw)):
+        # Empty key marks the message, everything after the blank line
+        if key_s == key_e:
+            assert(raw[key_s:key_s+1] == b'\n')
+            dct[b''] = raw[val_s:val_e]
+            return dct
+
+        key = raw[key_s:key_e]
+
+        # Grab the value
+        # Also, drop the leading space on continuation lines
+        value = raw[val_s:val_e].replace(b'\n ', b'\n')
+
+        if key in dct:
+            if isinstance(dct[key], list):
+                dct[key].append(value)
+            else:dct[key] = [ dct[key], value]
+        else:
+            dct[key] = value
+
+    return dct
 
 def kvlm_serialize(kvlm):
-    ret = b''
-    
+    parts = []
+
     # Output fields
-    for k in kvlm.keys():
+    for k, val in kvlm.items():
         # Skip the message itself
         if k == b'': continue
-        val = kvlm[k]
-        
+
         #Normalize to a list
-        if type(val) != list:
+        if not isinstance(val, list):
             val = [val]
-        
+
         for v in val:
-            ret += k + b' ' + (v.replace(b'\n', b'\n ')) + b'\n'
-        
-        # Append message
-        ret += b'\n' + kvlm[b'']
-        
-        return ret
+            parts.append(k + b' ' + (v.replace(b'\n', b'\n ')) + b'\n')
+
+    # Append message (outside the loop: it belongs after *all* fields,
+    # and the old early return dropped every field but the first)
+    parts.append(b'\n' + kvlm[b''])
+
+    # join is linear; += on bytes in a loop recopies the buffer each time
+    return b''.join(parts)
     
 class GitTreeLeaf:
     def __init__(self, mode, path, sha):
@@ -533,68 +749,70 @@ class GitTreeLeaf:
         self.path = path
         self.sha = sha
     
-def tree_parse_one(raw, start=0):
-    
-    SHA_BYTES_LEN = 20
-    
-    # Find space terminator of mode
-    x = raw.find(b' ', start)
-    assert(x-start == 5 or x-start==6)
-
-    
-    mode = raw[start:x]
-        
-    # FInd the null terminator
-    y = raw.find(b'\x00', x)
-    
-    path = raw[x+1:y]
-    
-    sha = hex(
-        int.from_bytes(
-            raw[y+1:y+SHA_BYTES_LEN+1], "big"))[2:]
-    return y+SHA_BYTES_LEN+1, GitTreeLeaf(mode, path, sha)
-
 def tree_parse(raw):
-    pos = 0
-    max = len(raw)
     ret = list()
-    
-    while pos < max:
-        pos, data = tree_parse_one(raw, pos)
-        ret.append(data)
+    # The scan only returns integer offsets; slicing the original bytes
+    # into GitTreeLeaf objects stays out here in Python
+    for mode_s, mode_e, path_s, path_e, sha_s in _tree_scan(_scan_buf(raw), len(raw)):
+        assert(mode_e-mode_s == 5 or mode_e-mode_s == 6)
+        ret.append(GitTreeLeaf(
+            raw[mode_s:mode_e],
+            raw[path_s:path_e],
+            # bytes.hex() is a single C call and, unlike going through
+            # int, keeps leading zero bytes of the sha
+            raw[sha_s:sha_s+20].hex()))
     return ret
 
 def tree_serializer(obj):
-    ret = b''
+    # Exact-size preallocation: mode + ' ' + path + NUL + 20 sha bytes
+    # per entry, so the buffer is written once and never reallocated
+    size = sum(len(i.mode) + 1 + len(i.path) + 1 + 20 for i in obj.items)
+    buf = bytearray(size)
+    off = 0
     for i in obj.items:
-        ret += i.mode
-        ret += b' '
-        ret += i.path
-        ret += b'\x00'
-        sha = int(i.sha ,16)
-        ret += sha.to_bytes(20, byteorder="big")
-    return ret
+        end = off + len(i.mode)
+        buf[off:end] = i.mode
+        buf[end] = 0x20
+        off = end + 1
+        end = off + len(i.path)
+        buf[off:end] = i.path
+        buf[end] = 0x00
+        off = end + 1
+        buf[off:off+20] = bytes.fromhex(i.sha)
+        off += 20
+    return bytes(buf)
 
 def ref_resolve(repo, ref):
-    with open(repo_file(repo, ref), 'r') as fp:
-        data = fp.read()[:-1]
-        # Drop \n
     start_str = "ref: "
-    if data.startswith(start_str):
-        return ref_resolve(repo, data[len(start_str):])
-    return data
+    # Loop instead of recursing so a cycle of symbolic refs can't
+    # overflow the stack
+    while True:
+        with open(repo_file(repo, ref), 'r') as fp:
+            data = fp.read()[:-1]
+            # Drop \n
+        if not data.startswith(start_str):
+            return data
+        ref = data[len(start_str):]
 
 def ref_list(repo, path=None):
     if not path:
         path = repo_dir(repo, "refs")
     ret = collections.OrderedDict()
-    
-    for f in sorted(os.listdir(path)):
-        can = os.path.join(path, f)
-        if os.path.isdir(can):
-            ret[f] = ref_list(repo, can)
-            continue
-        ret[f] = ref_resolve(repo, can)
+
+    # scandir's DirEntry caches the file type, so walking costs one
+    # syscall per entry instead of listdir + isdir
+    stack = [(path, ret)]
+    while stack:
+        path, dct = stack.pop()
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+        for e in entries:
+            if e.is_dir(follow_symlinks=False):
+                sub = collections.OrderedDict()
+                dct[e.name] = sub
+                stack.append((e.path, sub))
+                continue
+            dct[e.name] = ref_resolve(repo, e.path)
     return ret
 
 class GitIndexEntry:
@@ -630,43 +848,56 @@ class GitIndexEntry:
         self.flag_name_length = flag_name_length
         self.name = name
 
+# Fixed part of an index entry: ctime s/ns, mtime s/ns, dev, ino, mode,
+# uid, gid, fsize (ten big-endian uint32), 20-byte sha, uint16 flags
+_INDEX_HEADER = struct.Struct(">4sII")
+_INDEX_ENTRY = struct.Struct(">10I20sH")
+
 class GitIndex:
     signature = None
     version = None
     entries = []
-    
+
     def __init__(self, file):
-        raw = None
+        # Map the file and parse in place out of the page cache: no bulk
+        # read() copy, and the only per-entry slice left is the name,
+        # which has to outlive the map anyway
         with open(file, 'rb') as f:
-            raw = f.read()
-        
-        header = raw[:12]
-        self.signature = header[:4]
-        self.version = hex(int.from_bytes(header[4:8], "big"))
-        nindex = int.from_bytes(header[8:12], "big")
-        
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse(mm)
+        finally:
+            mm.close()
+
+    def _parse(self, mm):
+        self.signature, version, nindex = _INDEX_HEADER.unpack_from(mm, 0)
+        self.version = hex(version)
+
         self.entries = list()
-        
-        content = raw[12:]
-        idx = 0
+
+        idx = 12
         for i in range(0, nindex):
-            ctime= content[idx:idx+8]
-            mtime = content[idx+8:idx+16]
-            dev = content[idx+16:idx+20]
-            ino = content[idx+20: idx+24]
-            mode= content[idx+24:idx+28]  # TODO
-            uid = content[idx+28: idx+32]
-            gid = content[idx+32: idx+36]
-            fsize = content[idx+36: idx+40]
-            object_hash = content[idx+40: idx+60]
-            flag = content[idx+60: idx+62] # TODO
-            null_idx = content.find(b'\x00', idx+62) # TODO
-            name = content[idx+62: null_idx]
-            
+            # One unpack per entry instead of ~11 slice allocations
+            (ctime_s, ctime_n, mtime_s, mtime_n, dev, ino, mode,
+             uid, gid, fsize, object_hash, flag) = _INDEX_ENTRY.unpack_from(mm, idx)
+            idx += _INDEX_ENTRY.size
+            null_idx = mm.find(b'\x00', idx)
+            name = mm[idx:null_idx]
+
             idx = null_idx+1
-            idx = 8*ceil(idx/8)
-            
+            # Round up to the 8-byte entry padding, which is counted
+            # from the end of the 12-byte header
+            idx = ((idx - 12 + 7) & ~7) + 12
+
             self.entries.append(
-                GitIndexEntry(ctime=ctime, mtime=mtime, dev=dev, ino=ino, mode_type=mode, uid=uid, gid=gid, fsize=fsize, object_hash=object_hash, name=name)
+                GitIndexEntry(ctime=(ctime_s, ctime_n), mtime=(mtime_s, mtime_n),
+                              dev=dev, ino=ino,
+                              mode_type=mode >> 12, mode_perms=mode & 0o7777,
+                              uid=uid, gid=gid, fsize=fsize,
+                              object_hash=object_hash.hex(),
+                              flag_assume_valid=bool(flag & 0x8000),
+                              flag_extended=bool(flag & 0x4000),
+                              flag_stage=(flag >> 12) & 0x3,
+                              flag_name_length=flag & 0xFFF,
+                              name=name)
             )
- 
\ No newline at end of file